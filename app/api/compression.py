@@ -0,0 +1,31 @@
+"""
+api.compression сжимает ответы API: brotli для клиентов с Accept-Encoding: br, иначе gzip.
+brotli-asgi входит в requirements.txt; без него (урезанная установка) остается только gzip.
+Статика и страница приложения отдаются как есть: картинки и вложения в /static
+уже сжаты, и повторное сжатие только тратит CPU на каждом запросе.
+"""
+
+from fastapi.middleware.gzip import GZipMiddleware
+
+try:
+    # Для клиентов без br BrotliMiddleware сам отдает gzip
+    from brotli_asgi import BrotliMiddleware as _Compressor
+except ImportError:
+    _Compressor = GZipMiddleware
+
+COMPRESSED_PATH_PREFIX = "/api/"
+
+
+class ApiCompressionMiddleware:
+    """Пропускает через сжатие только запросы к /api/, остальные передает приложению напрямую."""
+
+    def __init__(self, app, minimum_size: int = 1024, path_prefix: str = COMPRESSED_PATH_PREFIX):
+        self.app = app
+        self.compressed_app = _Compressor(app, minimum_size=minimum_size)
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.path_prefix):
+            await self.compressed_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
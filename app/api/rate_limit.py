@@ -0,0 +1,191 @@
+"""
+api.rate_limit ограничивает частоту запросов (token bucket) для каждого пользователя
+и каждого маршрута, а также число одновременно выполняющихся «тяжелых» запросов,
+чтобы один скрипт не занимал весь пул соединений с БД.
+По умолчанию состояние хранится в памяти процесса: и корзины, и счетчик тяжелых
+запросов действуют на один воркер. При запуске нескольких воркеров задайте
+RATE_LIMIT_REDIS_URL, чтобы оба ограничения были общими для всех.
+При превышении лимита возвращается 429 с заголовком Retry-After.
+"""
+
+from dataclasses import dataclass
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from ..schemas.schemas_and_auth import AuthHandler
+import asyncio
+import math
+import os
+import time
+import uuid
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+@dataclass(frozen=True)
+class RateLimit:
+    rate: float      # сколько токенов пополняется в секунду
+    capacity: int    # максимальный размер всплеска
+
+# Общий лимит на пользователя по всем маршрутам
+DEFAULT_USER_LIMIT = RateLimit(rate=20, capacity=40)
+
+# Лимиты отдельных маршрутов (метод, путь) на пользователя
+ROUTE_LIMITS: dict[tuple[str, str], RateLimit] = {
+    # Интерфейс перезапрашивает список досок после каждого действия — лимит рассчитан на это
+    ("GET", "/api/v1/boards"): RateLimit(rate=10, capacity=30),
+    ("GET", "/api/v1/boards/compact"): RateLimit(rate=10, capacity=30),
+    ("GET", "/api/v1/admin/stats"): RateLimit(rate=1, capacity=5),
+    ("GET", "/api/v1/admin/users"): RateLimit(rate=1, capacity=5),
+    ("POST", "/api/v1/register"): RateLimit(rate=1, capacity=20),
+    ("POST", "/api/v1/login"): RateLimit(rate=1, capacity=20),
+}
+
+# Сколько тяжелых запросов одновременно выполняется (на воркер или на все воркеры с Redis)
+EXPENSIVE_ROUTES = {("GET", "/api/v1/boards"), ("GET", "/api/v1/boards/compact"), ("GET", "/api/v1/admin/stats"), ("GET", "/api/v1/admin/users")}
+EXPENSIVE_CONCURRENCY = int(os.getenv("RATE_LIMIT_EXPENSIVE_CONCURRENCY", "8"))
+EXPENSIVE_WAIT_SECONDS = 0.5
+EXPENSIVE_POLL_SECONDS = 0.02
+EXPENSIVE_SLOT_KEY = "expensive"
+
+
+class InMemoryRateLimitStore:
+    """Корзины токенов в памяти одного процесса."""
+
+    def __init__(self, max_keys: int = 100000):
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated_at)
+        self._max_keys = max_keys
+        self._slots: dict[str, set[str]] = {}
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """Забирает токен. Возвращает 0, если запрос разрешен, иначе сколько секунд ждать."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (float(limit.capacity), now))
+        tokens = min(float(limit.capacity), tokens + (now - updated_at) * limit.rate)
+        if tokens >= 1:
+            self._store(key, tokens - 1, now)
+            return 0.0
+        self._store(key, tokens, now)
+        return (1 - tokens) / limit.rate
+
+    def _store(self, key: str, tokens: float, now: float):
+        if len(self._buckets) >= self._max_keys and key not in self._buckets:
+            # Полная корзина неотличима от отсутствующей — такие ключи можно выбросить
+            self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < 60}
+        self._buckets[key] = (tokens, now)
+
+    async def acquire_slot(self, key: str, limit: int) -> str | None:
+        """Занимает одно из limit мест для одновременных запросов. Возвращает id места или None, если мест нет."""
+        slots = self._slots.setdefault(key, set())
+        if len(slots) >= limit: return None
+        slot = uuid.uuid4().hex
+        slots.add(slot)
+        return slot
+
+    async def release_slot(self, key: str, slot: str):
+        self._slots.get(key, set()).discard(slot)
+
+
+class RedisRateLimitStore:
+    """Общие для всех воркеров корзины токенов в Redis (атомарно через Lua-скрипт)."""
+
+    _SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    # Занятые места — элементы ZSET с моментом захвата в score. Каждое место истекает само
+    # через SLOT_TTL_SECONDS, поэтому места, брошенные упавшим воркером, возвращаются в пул
+    SLOT_TTL_SECONDS = 60
+
+    _ACQUIRE_SLOT_SCRIPT = """
+    local limit = tonumber(ARGV[1])
+    local now = tonumber(ARGV[2])
+    local ttl = tonumber(ARGV[3])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+    if redis.call('ZCARD', KEYS[1]) >= limit then return 0 end
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], math.ceil(ttl))
+    return 1
+    """
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as exc:
+            raise RuntimeError("Для RATE_LIMIT_REDIS_URL нужен пакет redis") from exc
+        self._redis = aioredis.from_url(url)
+        self._script = self._redis.register_script(self._SCRIPT)
+        self._acquire_slot_script = self._redis.register_script(self._ACQUIRE_SLOT_SCRIPT)
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        wait = await self._script(keys=[f"ratelimit:{key}"], args=[limit.rate, limit.capacity, time.time()])
+        return float(wait)
+
+    async def acquire_slot(self, key: str, limit: int) -> str | None:
+        slot = uuid.uuid4().hex
+        acquired = await self._acquire_slot_script(
+            keys=[f"ratelimit:slots:{key}"], args=[limit, time.time(), self.SLOT_TTL_SECONDS, slot]
+        )
+        return slot if int(acquired) else None
+
+    async def release_slot(self, key: str, slot: str):
+        await self._redis.zrem(f"ratelimit:slots:{key}", slot)
+
+
+def _too_many_requests(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Слишком много запросов"},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, store=None):
+        super().__init__(app)
+        if store is None:
+            store = RedisRateLimitStore(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else InMemoryRateLimitStore()
+        self.store = store
+
+    @staticmethod
+    def client_key(request: Request) -> str:
+        principal = AuthHandler.get_principal_from_header(request.headers.get("authorization"))
+        if principal: return f"user:{principal.user_id}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    async def dispatch(self, request: Request, call_next):
+        if not RATE_LIMIT_ENABLED or not request.url.path.startswith("/api/"):
+            return await call_next(request)
+
+        route = (request.method, request.url.path.rstrip("/"))
+        client = self.client_key(request)
+
+        retry_after = await self.store.take(client, DEFAULT_USER_LIMIT)
+        if not retry_after and route in ROUTE_LIMITS:
+            retry_after = await self.store.take(f"{client}:{route[0]}:{route[1]}", ROUTE_LIMITS[route])
+        if retry_after:
+            return _too_many_requests(retry_after)
+
+        if route not in EXPENSIVE_ROUTES:
+            return await call_next(request)
+
+        deadline = time.monotonic() + EXPENSIVE_WAIT_SECONDS
+        while (slot := await self.store.acquire_slot(EXPENSIVE_SLOT_KEY, EXPENSIVE_CONCURRENCY)) is None:
+            if time.monotonic() >= deadline:
+                return _too_many_requests(1)
+            await asyncio.sleep(EXPENSIVE_POLL_SECONDS)
+        try:
+            return await call_next(request)
+        finally:
+            await self.store.release_slot(EXPENSIVE_SLOT_KEY, slot)
@@ -7,24 +7,27 @@ api.routes отвечает за определение путей (endpoints),
 Здесь сосредоточена логика общения внешнего мира с приложением.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from typing import List
 import shutil
 import uuid
 import os
 
-from ..db.session import get_db
+from ..db.session import get_db, get_read_db
 from ..models.database_and_models import User, Board, Task, Column, BoardMember, BoardRole
 from ..schemas.schemas_and_auth import (
     UserCreate, UserLogin, UserRead, AuthHandler, TaskCreate, TaskUpdate, 
     TaskRead, BoardRead, MemberInvite, ColumnCreate, ColumnUpdate, ColumnRead, 
     BoardCreate, BoardUpdate, UserProfileUpdate, MemberRoleUpdate, TaskAttachmentRead,
-    SystemStats, PasswordChange, AdminPasswordReset, ForgotPassword
+    SystemStats, PasswordChange, AdminPasswordReset, ForgotPassword, TaskEventPage,
+    BoardCompactRead, Principal, UserWithToken, BoardClone, BoardTemplateCreate, BoardTemplateRead, Token
 )
-from ..services.kanban import KanbanService
+from ..services.kanban import KanbanService, LARGE_BOARD_TASKS, remove_upload_files
 
 router = APIRouter()
 
@@ -36,11 +39,35 @@ async def check_board_permission(db: AsyncSession, board_id: int, user_id: int,
         raise HTTPException(status_code=403, detail="Недостаточно прав")
     return member
 
-async def check_superuser(db: AsyncSession, user_id: int):
-    user = await db.get(User, user_id)
-    if not user or not user.is_superuser:
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_current_principal(credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme)) -> Principal:
+    """Достает пользователя из Bearer-токена. Обращений к БД нет, проверенные токены кэшируются."""
+    principal = AuthHandler.get_principal(credentials.credentials) if credentials else None
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Требуется авторизация",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return principal
+
+async def get_current_user_id(principal: Principal = Depends(get_current_principal)) -> int:
+    return principal.user_id
+
+async def check_superuser(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if not principal.is_superuser:
         raise HTTPException(status_code=403, detail="Требуются права администратора")
-    return user
+    return principal
+
+def deleted_user_error() -> HTTPException:
+    # Токен не проверяется по БД и живет до истечения срока, даже если пользователя уже удалили
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail="Пользователь не найден",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+def user_with_token(user: User) -> UserWithToken:
+    return UserWithToken(**UserRead.model_validate(user).model_dump(), access_token=AuthHandler.create_user_token(user))
 
 async def get_board_id_by_column(db: AsyncSession, column_id: int) -> int:
     result = await db.execute(select(Column).where(Column.id == column_id))
@@ -56,51 +83,66 @@ async def get_board_id_by_task(db: AsyncSession, task_id: int) -> int:
 
 # --- USER PROFILE ROUTES ---
 @router.put("/users/me", response_model=UserRead)
-async def update_profile(profile_data: UserProfileUpdate, user_id: int, db: AsyncSession = Depends(get_db)):
+async def update_profile(profile_data: UserProfileUpdate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     updated_user = await KanbanService.update_user_profile(db, user_id, description=profile_data.description)
     if not updated_user: raise HTTPException(status_code=404)
     return updated_user
 
 @router.post("/users/me/avatar", response_model=UserRead)
-async def upload_avatar(user_id: int, file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
+async def upload_avatar(user_id: int = Depends(get_current_user_id), file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
     ext = file.filename.split(".")[-1]
     filename = f"avatar_{user_id}_{uuid.uuid4().hex[:8]}.{ext}"
     path = f"app/static/uploads/{filename}"
     with open(path, "wb") as buffer: shutil.copyfileobj(file.file, buffer)
-    return await KanbanService.update_user_profile(db, user_id, avatar_url=f"/static/uploads/{filename}")
+    updated_user = await KanbanService.update_user_profile(db, user_id, avatar_url=f"/static/uploads/{filename}")
+    if not updated_user:
+        os.remove(path)
+        raise deleted_user_error()
+    return updated_user
 
 @router.put("/users/me/password")
-async def change_password(data: PasswordChange, user_id: int, db: AsyncSession = Depends(get_db)):
-    user = await db.get(User, user_id)
-    if not AuthHandler.verify_password(data.old_password, user.hashed_password):
+async def change_password(data: PasswordChange, user_id: int = Depends(get_current_user_id),
+                          read_db: AsyncSession = Depends(get_read_db), db: AsyncSession = Depends(get_db)):
+    # Чтение и bcrypt — до первого запроса через пишущую сессию, чтобы не держать её соединение
+    hashed_password = await read_db.scalar(select(User.hashed_password).where(User.id == user_id))
+    await read_db.close()
+    if not hashed_password or not await run_in_threadpool(AuthHandler.verify_password, data.old_password, hashed_password):
         raise HTTPException(status_code=400, detail="Неверный старый пароль")
-    await KanbanService.update_user_password(db, user_id, AuthHandler.get_password_hash(data.new_password))
-    return {"detail": "Пароль изменен"}
+    new_hashed_password = await run_in_threadpool(AuthHandler.get_password_hash, data.new_password)
+    user = await KanbanService.update_user_password(db, user_id, new_hashed_password)
+    if not user: raise HTTPException(status_code=404)
+    # Прежние токены отозваны сменой пароля — текущей вкладке выдаем новый
+    return {"detail": "Пароль изменен", "access_token": AuthHandler.create_user_token(user)}
 
 # --- AUTH ROUTES ---
-@router.post("/register", response_model=UserRead)
+@router.post("/register", response_model=UserWithToken)
 async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
-    existing = await db.execute(select(User).where(User.username == user_data.username))
-    if existing.scalar_one_or_none(): raise HTTPException(status_code=400, detail="Имя занято")
-    
-    users_count = await db.scalar(select(func.count(User.id)))
-    is_super = (users_count == 0) or (user_data.username.lower() == "admin")
-
-    hashed_pw = AuthHandler.get_password_hash(user_data.password)
-    new_user = User(username=user_data.username, email=user_data.email, hashed_password=hashed_pw, is_superuser=is_super)
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
-    await KanbanService.create_board(db, f"Доска {new_user.username}", new_user.id)
-    return new_user
-
-@router.post("/login", response_model=UserRead)
-async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
+    # bcrypt занимает процессор на сотни миллисекунд — считаем хэш вне event loop
+    # и до первого запроса, чтобы не держать соединение с БД во время хэширования
+    hashed_pw = await run_in_threadpool(AuthHandler.get_password_hash, user_data.password)
+    is_super = user_data.username.lower() == "admin"
+    new_user = await KanbanService.register_user(db, user_data.username, user_data.email, hashed_pw, is_super)
+    if not new_user: raise HTTPException(status_code=400, detail="Имя или email заняты")
+    return user_with_token(new_user)
+
+@router.post("/login", response_model=UserWithToken)
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(User).where(User.username == user_data.username))
     user = result.scalar_one_or_none()
-    if not user or not AuthHandler.verify_password(user_data.password, user.hashed_password):
+    # Соединение возвращается в пул до проверки пароля (объект user остается доступен)
+    await db.close()
+    if not user or not await run_in_threadpool(AuthHandler.verify_password, user_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверные данные")
-    return user
+    return user_with_token(user)
+
+@router.post("/auth/refresh", response_model=Token)
+async def refresh_token(principal: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_read_db)):
+    # Продление раз в полсрока токена: перечитываем пользователя, чтобы удаленный не продлил доступ,
+    # а флаг администратора в новом токене был актуальным. Токен, выданный до смены пароля, не продлевается
+    user = await db.get(User, principal.user_id)
+    if not user or user.token_version != principal.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Требуется авторизация")
+    return {"access_token": AuthHandler.create_user_token(user)}
 
 @router.post("/auth/forgot-password")
 async def forgot_password(data: ForgotPassword, db: AsyncSession = Depends(get_db)):
@@ -110,141 +152,184 @@ async def forgot_password(data: ForgotPassword, db: AsyncSession = Depends(get_d
 
 # --- ADMIN ROUTES ---
 @router.get("/admin/stats", response_model=SystemStats)
-async def get_stats(user_id: int, db: AsyncSession = Depends(get_db)):
-    await check_superuser(db, user_id)
+async def get_stats(admin: Principal = Depends(check_superuser), db: AsyncSession = Depends(get_read_db)):
     return await KanbanService.get_system_stats(db)
 
 @router.get("/admin/users", response_model=List[UserRead])
-async def get_all_users(user_id: int, db: AsyncSession = Depends(get_db)):
-    await check_superuser(db, user_id)
+async def get_all_users(admin: Principal = Depends(check_superuser), db: AsyncSession = Depends(get_read_db)):
     return await KanbanService.get_all_users(db)
 
 @router.put("/admin/users/{target_id}/password")
-async def admin_reset_password(target_id: int, data: AdminPasswordReset, user_id: int, db: AsyncSession = Depends(get_db)):
-    await check_superuser(db, user_id)
-    success = await KanbanService.update_user_password(db, target_id, AuthHandler.get_password_hash(data.new_password))
-    if not success: raise HTTPException(status_code=404)
+async def admin_reset_password(target_id: int, data: AdminPasswordReset, admin: Principal = Depends(check_superuser), db: AsyncSession = Depends(get_db)):
+    hashed_password = await run_in_threadpool(AuthHandler.get_password_hash, data.new_password)
+    if not await KanbanService.update_user_password(db, target_id, hashed_password): raise HTTPException(status_code=404)
     return {"detail": "Сброшен"}
 
 @router.delete("/admin/users/{target_id}")
-async def admin_delete_user(target_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
-    await check_superuser(db, user_id)
-    if target_id == user_id: raise HTTPException(status_code=400, detail="Нельзя удалить себя")
-    success = await KanbanService.admin_delete_user(db, target_id)
-    if not success: raise HTTPException(status_code=404)
+async def admin_delete_user(target_id: int, background_tasks: BackgroundTasks, admin: Principal = Depends(check_superuser), db: AsyncSession = Depends(get_db)):
+    if target_id == admin.user_id: raise HTTPException(status_code=400, detail="Нельзя удалить себя")
+    file_urls = await KanbanService.admin_delete_user(db, target_id)
+    if file_urls is None: raise HTTPException(status_code=404)
+    background_tasks.add_task(remove_upload_files, file_urls)
     return {"detail": "Удален"}
 
 # --- BOARD ROUTES ---
 @router.get("/boards", response_model=List[BoardRead])
-async def get_boards(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_boards(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
     return await KanbanService.get_user_boards(db, user_id)
 
+@router.get("/boards/compact", response_model=List[BoardCompactRead])
+async def get_boards_compact(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    boards = await KanbanService.get_user_boards(db, user_id)
+    return [KanbanService.compact_board(b) for b in boards]
+
 @router.post("/boards", response_model=BoardRead)
-async def create_new_board(board_data: BoardCreate, user_id: int, db: AsyncSession = Depends(get_db)):
+async def create_new_board(board_data: BoardCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     new_board = await KanbanService.create_board(db, board_data.title, user_id)
+    if not new_board: raise deleted_user_error()
     boards = await KanbanService.get_user_boards(db, user_id)
     return next((b for b in boards if b.id == new_board.id), new_board)
 
 @router.put("/boards/{board_id}", response_model=BoardRead)
-async def update_board_info(board_id: int, board_data: BoardUpdate, user_id: int, db: AsyncSession = Depends(get_db)):
+async def update_board_info(board_id: int, board_data: BoardUpdate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN])
     await KanbanService.update_board(db, board_id, board_data.title)
     boards = await KanbanService.get_user_boards(db, user_id)
     return next((b for b in boards if b.id == board_id), None)
 
 @router.delete("/boards/{board_id}")
-async def delete_board(board_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_board(board_id: int, background_tasks: BackgroundTasks, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER])
-    success = await KanbanService.delete_board(db, board_id)
-    if not success: raise HTTPException(status_code=404)
+    if await KanbanService.count_board_tasks(db, board_id) > LARGE_BOARD_TASKS:
+        # Большую доску сразу скрываем у всех участников, а строки удаляем в фоне порциями
+        if not await KanbanService.detach_board(db, board_id): raise HTTPException(status_code=404)
+        background_tasks.add_task(KanbanService.delete_board_in_chunks, board_id)
+        return {"detail": "Удалена"}
+    file_urls = await KanbanService.delete_board(db, board_id)
+    if file_urls is None: raise HTTPException(status_code=404)
+    background_tasks.add_task(remove_upload_files, file_urls)
     return {"detail": "Удалена"}
 
+@router.post("/boards/{board_id}/clone", response_model=BoardRead)
+async def clone_board(board_id: int, data: BoardClone, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN, BoardRole.MEMBER])
+    new_board = await KanbanService.clone_board(db, board_id, user_id, data.title, data.include_tasks, data.include_members)
+    if not new_board: raise HTTPException(status_code=404)
+    return await KanbanService.get_board(db, new_board.id)
+
+# --- TEMPLATE ROUTES ---
+@router.get("/templates", response_model=List[BoardTemplateRead])
+async def get_templates(user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_read_db)):
+    return await KanbanService.get_user_templates(db, user_id)
+
+@router.post("/boards/{board_id}/templates", response_model=BoardTemplateRead)
+async def create_template(board_id: int, data: BoardTemplateCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN])
+    return await KanbanService.create_template(db, board_id, user_id, data.title, data.description)
+
+@router.post("/templates/{template_id}/boards", response_model=BoardRead)
+async def create_board_from_template(template_id: int, board_data: BoardCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    new_board = await KanbanService.create_board_from_template(db, template_id, board_data.title, user_id)
+    if not new_board: raise HTTPException(status_code=404, detail="Шаблон не найден")
+    return await KanbanService.get_board(db, new_board.id)
+
+@router.delete("/templates/{template_id}")
+async def delete_template(template_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    if not await KanbanService.delete_template(db, template_id, user_id): raise HTTPException(status_code=404)
+    return {"detail": "Удален"}
+
 # --- MEMBER ROUTES ---
 @router.post("/boards/{board_id}/invite")
-async def invite_to_board(board_id: int, invite: MemberInvite, user_id: int, db: AsyncSession = Depends(get_db)):
+async def invite_to_board(board_id: int, invite: MemberInvite, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN])
     success, message = await KanbanService.invite_member(db, board_id, invite.email, invite.role)
     if not success: raise HTTPException(status_code=400, detail=message)
     return {"detail": "Приглашен"}
 
 @router.put("/boards/{board_id}/members/{target_user_id}")
-async def update_member(board_id: int, target_user_id: int, data: MemberRoleUpdate, user_id: int, db: AsyncSession = Depends(get_db)):
+async def update_member(board_id: int, target_user_id: int, data: MemberRoleUpdate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN])
     await KanbanService.update_member_role(db, board_id, target_user_id, data.role)
     return {"detail": "Обновлена"}
 
 @router.delete("/boards/{board_id}/members/{target_user_id}")
-async def kick_member(board_id: int, target_user_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
+async def kick_member(board_id: int, target_user_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN])
     await KanbanService.remove_member(db, board_id, target_user_id)
     return {"detail": "Исключен"}
 
 # --- COLUMN ROUTES ---
 @router.post("/boards/{board_id}/columns", response_model=ColumnRead)
-async def create_column(board_id: int, col_data: ColumnCreate, user_id: int, db: AsyncSession = Depends(get_db)):
+async def create_column(board_id: int, col_data: ColumnCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN])
     return await KanbanService.create_column(db, board_id, col_data.title, col_data.order)
 
 @router.put("/columns/{column_id}", response_model=ColumnRead)
-async def update_column(column_id: int, col_data: ColumnUpdate, user_id: int, db: AsyncSession = Depends(get_db)):
+async def update_column(column_id: int, col_data: ColumnUpdate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     board_id = await get_board_id_by_column(db, column_id)
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN])
     return await KanbanService.update_column(db, column_id, col_data.title)
 
 @router.delete("/columns/{column_id}")
-async def delete_column(column_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_column(column_id: int, background_tasks: BackgroundTasks, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     board_id = await get_board_id_by_column(db, column_id)
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN])
-    await KanbanService.delete_column(db, column_id)
+    file_urls = await KanbanService.delete_column(db, column_id, user_id)
+    background_tasks.add_task(remove_upload_files, file_urls or [])
     return {"detail": "Удалено"}
 
 # --- TASK ROUTES ---
 @router.post("/tasks", response_model=TaskRead)
-async def create_task(task: TaskCreate, user_id: int, db: AsyncSession = Depends(get_db)):
+async def create_task(task: TaskCreate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     board_id = await get_board_id_by_column(db, task.column_id)
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN, BoardRole.MEMBER])
-    return await KanbanService.create_task(db, task)
+    return await KanbanService.create_task(db, task, board_id, user_id)
 
 @router.put("/tasks/{task_id}", response_model=TaskRead)
-async def update_task(task_id: int, task_data: TaskUpdate, user_id: int, db: AsyncSession = Depends(get_db)):
+async def update_task(task_id: int, task_data: TaskUpdate, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     board_id = await get_board_id_by_task(db, task_id)
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN, BoardRole.MEMBER])
-    updated_task = await KanbanService.update_task(db, task_id, task_data)
+    updated_task = await KanbanService.update_task(db, task_id, task_data, user_id)
     if not updated_task: raise HTTPException(status_code=404)
     return updated_task
 
 @router.delete("/tasks/{task_id}")
-async def delete_task(task_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_task(task_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     board_id = await get_board_id_by_task(db, task_id)
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN, BoardRole.MEMBER])
-    await KanbanService.delete_task(db, task_id)
+    await KanbanService.delete_task(db, task_id, user_id)
     return {"detail": "Удалено"}
 
 @router.patch("/tasks/{task_id}", response_model=TaskRead)
-async def update_task_column(task_id: int, column_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
+async def update_task_column(task_id: int, column_id: int, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     board_id = await get_board_id_by_task(db, task_id)
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN, BoardRole.MEMBER])
     if board_id != await get_board_id_by_column(db, column_id):
         raise HTTPException(status_code=400, detail="Нельзя переместить в чужую доску")
-    
-    result = await db.execute(select(Task).where(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    task.column_id = column_id
-    await db.commit()
-    
-    # Решение ошибки при перетаскивании (MissingGreenlet)
-    res2 = await db.execute(
-        select(Task).where(Task.id == task_id)
-        .options(selectinload(Task.assignee), selectinload(Task.attachments))
-    )
-    return res2.scalar_one()
+    return await KanbanService.move_task(db, task_id, column_id, board_id, user_id)
 
 @router.post("/tasks/{task_id}/attachments", response_model=TaskAttachmentRead)
-async def upload_task_file(task_id: int, user_id: int, file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
+async def upload_task_file(task_id: int, user_id: int = Depends(get_current_user_id), file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
     board_id = await get_board_id_by_task(db, task_id)
     await check_board_permission(db, board_id, user_id, [BoardRole.OWNER, BoardRole.ADMIN, BoardRole.MEMBER])
     ext = file.filename.split(".")[-1]
     filename = f"{uuid.uuid4().hex}.{ext}"
     path = f"app/static/uploads/{filename}"
     with open(path, "wb") as buffer: shutil.copyfileobj(file.file, buffer)
-    return await KanbanService.add_task_attachment(db, task_id, file.filename, f"/static/uploads/{filename}")
\ No newline at end of file
+    return await KanbanService.add_task_attachment(db, task_id, board_id, file.filename, f"/static/uploads/{filename}", user_id)
+
+# --- ACTIVITY ROUTES ---
+@router.get("/tasks/{task_id}/history", response_model=TaskEventPage)
+async def get_task_history(task_id: int, user_id: int = Depends(get_current_user_id), cursor: str | None = None, limit: int = 50, db: AsyncSession = Depends(get_read_db)):
+    # История остается доступной и после удаления задачи вместе с колонкой
+    board_id = await KanbanService.get_task_board_id(db, task_id)
+    if board_id is None: raise HTTPException(status_code=404, detail="Задача не найдена")
+    await check_board_permission(db, board_id, user_id, list(BoardRole))
+    try: return await KanbanService.get_task_history(db, task_id, cursor, limit)
+    except ValueError: raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+@router.get("/boards/{board_id}/activity", response_model=TaskEventPage)
+async def get_board_activity(board_id: int, user_id: int = Depends(get_current_user_id), cursor: str | None = None, limit: int = 50, db: AsyncSession = Depends(get_read_db)):
+    await check_board_permission(db, board_id, user_id, list(BoardRole))
+    try: return await KanbanService.get_board_activity(db, board_id, cursor, limit)
+    except ValueError: raise HTTPException(status_code=400, detail="Некорректный курсор")
\ No newline at end of file
@@ -1,15 +1,58 @@
+from fastapi import Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import AsyncGenerator
-from ..models.database_and_models import async_session
+import time
+from ..models.database_and_models import (
+    async_session, read_async_session, READ_DATABASE_URL, READ_AFTER_WRITE_SECONDS
+)
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+# Момент последней записи клиента хранится у самого клиента (cookie, а для API-клиентов без
+# cookie — заголовок), поэтому read-your-writes работает при любом числе воркеров и инстансов
+LAST_WRITE_COOKIE = "kanban_last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+def mark_write(response: Response):
+    """Сообщает клиенту момент его записи: следующие чтения в течение окна пойдут в основную БД."""
+    now = f"{time.time():.3f}"
+    response.set_cookie(LAST_WRITE_COOKIE, now, max_age=max(1, int(READ_AFTER_WRITE_SECONDS) + 1), httponly=True, samesite="lax")
+    response.headers[LAST_WRITE_HEADER] = now
+
+def has_recent_write(request: Request) -> bool:
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    try: last_write = float(value)
+    except (TypeError, ValueError): return False
+    return time.time() - last_write < READ_AFTER_WRITE_SECONDS
+
+async def get_db(request: Request, response: Response) -> AsyncGenerator[AsyncSession, None]:
     """
     Функция-генератор (Dependency), которая создает новую сессию БД
     для каждого HTTP-запроса и гарантированно закрывает её после завершения.
+    Изменяющие запросы помечают клиента, чтобы его следующие чтения шли в основную БД.
     """
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        mark_write(response)
     async with async_session() as session:
         try:
             yield session
         finally:
             # Закрытие сессии происходит автоматически благодаря контекстному менеджеру 'async with'
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для обработчиков, которые только читают данные. Направляет запрос в реплику,
+    если она настроена, но в течение READ_AFTER_WRITE_SECONDS после собственной записи
+    клиента читает из основной БД, чтобы он сразу видел свои изменения.
+    """
+    if READ_DATABASE_URL:
+        use_primary = has_recent_write(request)
+    else:
+        # Реплики нет: либо всё идет в основную БД, либо это пул читателей того же файла SQLite,
+        # который видит зафиксированные записи сразу
+        use_primary = read_async_session is async_session
+    session_factory = async_session if use_primary else read_async_session
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
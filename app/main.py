@@ -3,25 +3,39 @@ app.Main представляет собой точку входа в прило
 настройку жизненного цикла приложения для автоматического создания таблиц в базе данных
 при старте, монтирование папки со статическими файлами (static) и подключение системы шаблонов Jinja2.
 Собирает все части проекта воедино. Он определяет корневой маршрут для отображения главной страницы и
-подключает все API-роутеры, чтобы выстроить порядок обработки запросов.
+подключает все API-роутеры, ограничитель частоты запросов и сжатие ответов, чтобы выстроить порядок обработки запросов.
 """
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from app.api.routes import router as kanban_router
+from app.api.rate_limit import RateLimitMiddleware
+from app.api.compression import ApiCompressionMiddleware
 from app.models.database_and_models import engine, Base
+from app.services.kanban import KanbanService
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Незавершенные фоновые удаления больших досок продолжаются в фоне, не задерживая старт
+    app.state.resume_deletions = asyncio.create_task(KanbanService.resume_board_deletions())
     yield
 
-app = FastAPI(title="Kanban Prototype", lifespan=lifespan)
+# Ответы меньше этого размера не сжимаются: выигрыш не окупает затраты CPU
+COMPRESSION_MINIMUM_SIZE = 1024
+
+app = FastAPI(title="Kanban Prototype", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Сжимаются только ответы API; статика отдается без повторного сжатия
+app.add_middleware(ApiCompressionMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+app.add_middleware(RateLimitMiddleware)
 
 # Создаем директории для загрузки файлов
 os.makedirs("app/static/media", exist_ok=True)
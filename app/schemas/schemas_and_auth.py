@@ -1,23 +1,52 @@
 """
 Данный файл содержит валидатор аутентификации, а также схемы
-пользователя, задач, колонок и досок с учетом ролей.
+пользователя, задач, колонок и досок с учетом ролей и журнала событий.
 """
 
 from pydantic import BaseModel, EmailStr, ConfigDict, field_validator
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from jose import jwt
+from jose import jwt, JWTError
+from dataclasses import dataclass
 import bcrypt
+import logging
+import os
+import secrets
+import time
 
 if not hasattr(bcrypt, "__about__"):
     bcrypt.__about__ = type('About', (object,), {'__version__': bcrypt.__version__})
 
-SECRET_KEY = "your-secret-key-here"
+logger = logging.getLogger(__name__)
+
+# Ключ подписи токенов берется только из окружения. Без него генерируется случайный ключ:
+# токены перестают действовать после перезапуска и не принимаются другими воркерами.
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    SECRET_KEY = secrets.token_urlsafe(64)
+    logger.warning(
+        "SECRET_KEY не задан: сгенерирован временный ключ. Задайте SECRET_KEY в окружении, "
+        "иначе токены сбрасываются при перезапуске и не работают при нескольких воркерах."
+    )
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Срок жизни токена; интерфейс продлевает его через /auth/refresh, пока вкладка открыта
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# Сколько секунд держим в памяти уже проверенный токен, чтобы не декодировать его на каждый запрос
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+PRINCIPAL_CACHE_MAX_SIZE = 10000
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+@dataclass(frozen=True)
+class Principal:
+    """Пользователь, от имени которого выполняется запрос (берется из claims токена)."""
+    user_id: int
+    is_superuser: bool = False
+    token_version: int = 0
+
+# token -> (principal, момент, до которого запись в кэше действительна)
+_principal_cache: dict[str, tuple[Principal, float]] = {}
+
 class AuthHandler:
     @staticmethod
     def verify_password(plain_password, hashed_password):
@@ -35,6 +64,41 @@ class AuthHandler:
         to_encode.update({"exp": expire})
         return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+    @staticmethod
+    def create_user_token(user) -> str:
+        return AuthHandler.create_access_token({
+            "sub": str(user.id), "su": bool(user.is_superuser), "tv": user.token_version or 0
+        })
+
+    @staticmethod
+    def get_principal(token: str) -> Optional[Principal]:
+        """Проверяет токен и возвращает Principal без обращения к БД; None, если токен недействителен."""
+        now = time.monotonic()
+        cached = _principal_cache.get(token)
+        if cached and cached[1] > now:
+            return cached[0]
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            principal = Principal(
+                user_id=int(claims["sub"]), is_superuser=bool(claims.get("su", False)),
+                token_version=int(claims.get("tv", 0))
+            )
+        except (JWTError, KeyError, ValueError):
+            return None
+        if len(_principal_cache) >= PRINCIPAL_CACHE_MAX_SIZE:
+            _principal_cache.clear()
+        # Запись в кэше не переживает срок действия самого токена
+        ttl = min(PRINCIPAL_CACHE_TTL_SECONDS, claims["exp"] - time.time())
+        _principal_cache[token] = (principal, now + ttl)
+        return principal
+
+    @staticmethod
+    def get_principal_from_header(authorization: Optional[str]) -> Optional[Principal]:
+        if not authorization: return None
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token: return None
+        return AuthHandler.get_principal(token)
+
 class UserBase(BaseModel):
     username: str
     email: EmailStr
@@ -63,6 +127,14 @@ class UserRead(UserBase):
     is_superuser: bool = False
     model_config = ConfigDict(from_attributes=True)
 
+class UserWithToken(UserRead):
+    access_token: str
+    token_type: str = "bearer"
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+
 class UserProfileUpdate(BaseModel):
     description: Optional[str] = None
 
@@ -113,6 +185,20 @@ class TaskRead(BaseModel):
         return str(v.value) if hasattr(v, 'value') else (str(v) if v is not None else "MEDIUM")
     model_config = ConfigDict(from_attributes=True)
 
+class TaskEventRead(BaseModel):
+    id: int
+    board_id: int
+    task_id: int
+    user_id: Optional[int] = None
+    event_type: str
+    payload: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+class TaskEventPage(BaseModel):
+    items: List[TaskEventRead] = []
+    next_cursor: Optional[str] = None  # курсор для следующей страницы
+
 class ColumnCreate(BaseModel):
     title: str
     order: Optional[int] = 0
@@ -144,6 +230,57 @@ class BoardRead(BaseModel):
     columns: List[ColumnRead] = []
     model_config = ConfigDict(from_attributes=True)
 
+# Компактное представление доски: пользователи передаются один раз в users,
+# а задачи и участники ссылаются на них по id
+class TaskCompactRead(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    priority: str
+    column_id: int
+    assignee_id: Optional[int] = None
+    attachments: List[TaskAttachmentRead] = []
+
+class ColumnCompactRead(BaseModel):
+    id: int
+    title: str
+    order: int
+    tasks: List[TaskCompactRead] = []
+
+class BoardMemberCompactRead(BaseModel):
+    user_id: int
+    role: str
+
+class BoardCompactRead(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    background_url: Optional[str] = None
+    members: List[BoardMemberCompactRead] = []
+    columns: List[ColumnCompactRead] = []
+    users: Dict[int, UserRead] = {}
+
+class BoardClone(BaseModel):
+    title: Optional[str] = None
+    include_tasks: bool = True
+    include_members: bool = False
+
+class BoardTemplateCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+
+class BoardTemplateColumnRead(BaseModel):
+    title: str
+    order: int
+    model_config = ConfigDict(from_attributes=True)
+
+class BoardTemplateRead(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    columns: List[BoardTemplateColumnRead] = []
+    model_config = ConfigDict(from_attributes=True)
+
 class MemberInvite(BaseModel):
     email: EmailStr
     role: str = "MEMBER"
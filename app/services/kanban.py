@@ -1,10 +1,140 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert, delete, case, literal, false, exists, or_, and_, null, Integer, DateTime
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from typing import List
-from ..models.database_and_models import Board, Column, Task, TaskPriority, User, BoardMember, BoardRole, TaskAttachment
+from datetime import datetime, timezone
+import base64
+import binascii
+import logging
+import os
+from ..models.database_and_models import (
+    async_session, Board, Column, Task, TaskPriority, User, BoardMember, BoardRole, TaskAttachment, TaskEvent,
+    BoardTemplate, BoardTemplateColumn, BoardDeletion, BootstrapAdmin
+)
+
+EVENTS_PAGE_LIMIT = 200
+
+DEFAULT_COLUMNS = ["В плане", "В работе", "Готово"]
+
+# Что подгружается вместе с доской для ответа BoardRead
+BOARD_LOAD_OPTIONS = (
+    selectinload(Board.columns).selectinload(Column.tasks).selectinload(Task.assignee),
+    selectinload(Board.columns).selectinload(Column.tasks).selectinload(Task.attachments),
+    selectinload(Board.member_associations).selectinload(BoardMember.user),
+)
+
+# Доски с большим числом задач удаляются в фоне порциями, чтобы не держать долгую транзакцию
+LARGE_BOARD_TASKS = 10000
+BOARD_DELETE_CHUNK_SIZE = 5000
+
+UPLOADS_URL_PREFIX = "/static/uploads/"
+UPLOADS_DIR = "app/static/uploads"
+
+logger = logging.getLogger(__name__)
+
+def remove_upload_files(file_urls: list[str]):
+    """Удаляет с диска загруженные файлы, на которые больше не ссылается ни одна строка БД."""
+    for url in file_urls:
+        if not url or not url.startswith(UPLOADS_URL_PREFIX): continue
+        path = os.path.join(UPLOADS_DIR, os.path.basename(url))
+        try: os.remove(path)
+        except FileNotFoundError: pass
+        except OSError: logger.warning("Не удалось удалить файл %s", path)
+
+# Задача не удалена (в старых строках is_deleted может быть NULL)
+ACTIVE_TASK = (Task.is_deleted == False) | (Task.is_deleted.is_(None))
 
 class KanbanService:
+    # --- FILES ---
+    @staticmethod
+    async def _unreferenced_files(db: AsyncSession, file_urls) -> list[str]:
+        """Оставляет только файлы, на которые после удаления не ссылается ни одно вложение (копии досок делят файлы)."""
+        file_urls = set(file_urls)
+        if not file_urls: return []
+        still_used = (await db.scalars(
+            select(TaskAttachment.file_url).where(TaskAttachment.file_url.in_(file_urls)).distinct()
+        )).all()
+        return list(file_urls - set(still_used))
+
+    # --- ACTIVITY LOG ---
+    @staticmethod
+    async def _record_events(db: AsyncSession, events: list[dict]):
+        """Пишет события одной пачкой (executemany) в текущую транзакцию, до commit."""
+        if events:
+            await db.execute(insert(TaskEvent), events)
+
+    @staticmethod
+    async def _record_events_from_select(db: AsyncSession, source, user_id: int | None, event_type: str):
+        """
+        Пишет по событию на каждую строку source (колонки board_id, task_id) одним
+        INSERT ... SELECT — для массовых изменений, затрагивающих много задач сразу.
+        """
+        src = source.subquery()
+        await db.execute(insert(TaskEvent).from_select(
+            ["board_id", "task_id", "user_id", "event_type", "payload", "created_at"],
+            select(
+                src.c.board_id, src.c.task_id, literal(user_id, Integer), literal(event_type), null(),
+                literal(datetime.now(timezone.utc), DateTime(timezone=True))
+            )
+        ))
+
+    @staticmethod
+    def _event(board_id: int, task_id: int, user_id: int | None, event_type: str, payload: dict | None = None) -> dict:
+        return {"board_id": board_id, "task_id": task_id, "user_id": user_id, "event_type": event_type, "payload": payload}
+
+    @staticmethod
+    def _encode_cursor(event: TaskEvent) -> str:
+        raw = f"{event.created_at.isoformat()}|{event.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+        """Разбирает курсор страницы; ValueError, если он поврежден."""
+        try:
+            created_at, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(created_at), int(event_id)
+        except (binascii.Error, UnicodeDecodeError) as exc:
+            raise ValueError("Некорректный курсор") from exc
+
+    @staticmethod
+    async def _events_page(db: AsyncSession, condition, cursor: str | None, limit: int):
+        # Keyset-пагинация по (created_at, id): не зависит от размера таблицы, в отличие от OFFSET,
+        # и при секционировании по created_at затрагивает только нужные секции
+        limit = max(1, min(limit, EVENTS_PAGE_LIMIT))
+        stmt = select(TaskEvent).where(condition)
+        if cursor is not None:
+            created_at, event_id = KanbanService._decode_cursor(cursor)
+            stmt = stmt.where(or_(
+                TaskEvent.created_at < created_at,
+                and_(TaskEvent.created_at == created_at, TaskEvent.id < event_id)
+            ))
+        result = await db.execute(stmt.order_by(TaskEvent.created_at.desc(), TaskEvent.id.desc()).limit(limit))
+        items = result.scalars().all()
+        next_cursor = KanbanService._encode_cursor(items[-1]) if len(items) == limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def get_task_history(db: AsyncSession, task_id: int, cursor: str | None = None, limit: int = 50):
+        return await KanbanService._events_page(db, TaskEvent.task_id == task_id, cursor, limit)
+
+    @staticmethod
+    async def get_task_board_id(db: AsyncSession, task_id: int) -> int | None:
+        """
+        Доска задачи: по живой строке tasks, а если задача уже удалена вместе с колонкой
+        или доской — по её последнему событию в журнале (у журнала нет внешних ключей).
+        """
+        board_id = await db.scalar(select(Column.board_id).join(Task).where(Task.id == task_id))
+        if board_id is not None: return board_id
+        return await db.scalar(
+            select(TaskEvent.board_id).where(TaskEvent.task_id == task_id)
+            .order_by(TaskEvent.created_at.desc(), TaskEvent.id.desc()).limit(1)
+        )
+
+    @staticmethod
+    async def get_board_activity(db: AsyncSession, board_id: int, cursor: str | None = None, limit: int = 50):
+        return await KanbanService._events_page(db, TaskEvent.board_id == board_id, cursor, limit)
+
     # --- ADMIN / SYSTEM ---
     @staticmethod
     async def get_system_stats(db: AsyncSession):
@@ -26,33 +156,74 @@ class KanbanService:
         return result.scalars().all()
 
     @staticmethod
-    async def admin_delete_user(db: AsyncSession, user_id: int):
-        user = await db.get(User, user_id)
-        if user:
-            await db.delete(user)
+    async def admin_delete_user(db: AsyncSession, user_id: int) -> list[str] | None:
+        """
+        Удаляет пользователя одним DELETE; членство в досках удаляет каскад БД,
+        а назначенные задачи получают assignee_id = NULL.
+        Возвращает файлы для удаления с диска или None, если пользователь не найден.
+        """
+        avatar_url = await db.scalar(select(User.avatar_url).where(User.id == user_id))
+        result = await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+        if not result.rowcount: return None
+        return [avatar_url] if avatar_url else []
+
+    @staticmethod
+    async def _claim_bootstrap_admin(db: AsyncSession, user_id: int) -> bool:
+        """
+        Делает пользователя первым администратором, если других пользователей нет.
+        Решение принимает БД: INSERT ... SELECT ... WHERE NOT EXISTS вставляет строку с id = 1,
+        а одновременные первые регистрации, не видящие друг друга, упираются в первичный ключ.
+        """
+        try:
+            async with db.begin_nested():
+                result = await db.execute(insert(BootstrapAdmin).from_select(
+                    ["id", "user_id"],
+                    select(literal(1), literal(user_id)).where(~exists().where(User.id != user_id))
+                ))
+        except IntegrityError:
+            return False
+        return result.rowcount == 1
+
+    @staticmethod
+    async def register_user(db: AsyncSession, username: str, email: str, hashed_password: str, is_superuser: bool = False):
+        """
+        Создает пользователя вместе с его первой доской в одной транзакции (один commit).
+        Первый пользователь в БД становится администратором.
+        Если имя или email заняты, откатывает транзакцию и возвращает None.
+        """
+        new_user = User(
+            username=username, email=email, hashed_password=hashed_password,
+            description=None, avatar_url=None, is_superuser=is_superuser
+        )
+        db.add(new_user)
+        try:
+            await db.flush()
+            if not is_superuser and await KanbanService._claim_bootstrap_admin(db, new_user.id):
+                new_user.is_superuser = True
+            await KanbanService._add_board(db, f"Доска {username}", new_user.id)
             await db.commit()
-            return True
-        return False
+        except IntegrityError:
+            await db.rollback()
+            return None
+        return new_user
 
     @staticmethod
-    async def update_user_password(db: AsyncSession, user_id: int, new_hashed_password: str):
+    async def update_user_password(db: AsyncSession, user_id: int, new_hashed_password: str) -> User | None:
+        """Меняет пароль и версию токенов: выданные ранее токены больше не продлеваются."""
         user = await db.get(User, user_id)
-        if user:
-            user.hashed_password = new_hashed_password
-            await db.commit()
-            return True
-        return False
+        if not user: return None
+        user.hashed_password = new_hashed_password
+        user.token_version = User.token_version + 1
+        await db.commit()
+        await db.refresh(user)
+        return user
 
     # --- BOARDS & MEMBERS ---
     @staticmethod
     async def get_user_boards(db: AsyncSession, user_id: int) -> List[Board]:
         result = await db.execute(
-            select(Board).join(BoardMember).where(BoardMember.user_id == user_id)
-            .options(
-                selectinload(Board.columns).selectinload(Column.tasks).selectinload(Task.assignee),
-                selectinload(Board.columns).selectinload(Column.tasks).selectinload(Task.attachments),
-                selectinload(Board.member_associations).selectinload(BoardMember.user)
-            )
+            select(Board).join(BoardMember).where(BoardMember.user_id == user_id).options(*BOARD_LOAD_OPTIONS)
         )
         boards = result.scalars().unique().all()
         for board in boards:
@@ -60,21 +231,217 @@ class KanbanService:
                 col.tasks = [t for t in col.tasks if not getattr(t, 'is_deleted', False)]
         return boards
 
+    @staticmethod
+    async def get_board(db: AsyncSession, board_id: int) -> Board | None:
+        """Загружает одну доску со всем содержимым — для ответа после её создания или копирования."""
+        board = (await db.scalars(
+            select(Board).where(Board.id == board_id).options(*BOARD_LOAD_OPTIONS).execution_options(populate_existing=True)
+        )).first()
+        if board:
+            for col in board.columns:
+                col.tasks = [t for t in col.tasks if not getattr(t, 'is_deleted', False)]
+        return board
+
+    @staticmethod
+    def compact_board(board: Board) -> dict:
+        """Нормализует доску: каждый пользователь попадает в users один раз, задачи ссылаются на него по id."""
+        users = {}
+        for assoc in board.member_associations:
+            users[assoc.user_id] = assoc.user
+        columns = []
+        for col in board.columns:
+            tasks = []
+            for t in col.tasks:
+                if t.assignee is not None: users[t.assignee_id] = t.assignee
+                tasks.append({
+                    "id": t.id, "title": t.title, "description": t.description,
+                    "priority": t.priority.value if t.priority else "MEDIUM",
+                    "column_id": t.column_id, "assignee_id": t.assignee_id, "attachments": t.attachments
+                })
+            columns.append({"id": col.id, "title": col.title, "order": col.order, "tasks": tasks})
+        return {
+            "id": board.id, "title": board.title, "description": board.description,
+            "background_url": board.background_url,
+            "members": [{"user_id": a.user_id, "role": a.role.value} for a in board.member_associations],
+            "columns": columns,
+            "users": users,
+        }
+
+    @staticmethod
+    async def _add_board(db: AsyncSession, title: str, user_id: int) -> Board:
+        """Добавляет доску с владельцем и колонками по умолчанию в текущую транзакцию, без commit."""
+        new_board = Board(title=title, description=None, background_url=None)
+        db.add(new_board)
+        await db.flush()
+
+        db.add(BoardMember(user_id=user_id, board_id=new_board.id, role=BoardRole.OWNER))
+        # add_all: при flush колонки уходят одним INSERT на несколько строк
+        db.add_all([
+            Column(title=col_title, order=index, board_id=new_board.id)
+            for index, col_title in enumerate(DEFAULT_COLUMNS)
+        ])
+        return new_board
+
     @staticmethod
     async def create_board(db: AsyncSession, title: str, user_id: int):
-        new_board = Board(title=title)
+        """Возвращает None, если владельца уже нет в БД (токен удаленного пользователя еще действует)."""
+        try:
+            new_board = await KanbanService._add_board(db, title, user_id)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            return None
+        return new_board
+
+    # --- CLONING & TEMPLATES ---
+    @staticmethod
+    async def _copy_columns(db: AsyncSession, board_id: int, columns: list[tuple[str, int]]) -> list[int]:
+        """Вставляет колонки одним batched INSERT ... RETURNING и возвращает новые id в том же порядке."""
+        if not columns: return []
+        result = await db.scalars(
+            insert(Column).returning(Column.id, sort_by_parameter_order=True),
+            [{"title": title, "order": order, "board_id": board_id} for title, order in columns]
+        )
+        return list(result.all())
+
+    @staticmethod
+    async def clone_board(db: AsyncSession, board_id: int, user_id: int, title: str | None = None,
+                          include_tasks: bool = True, include_members: bool = False):
+        """
+        Копирует доску в одной транзакции. Задачи и участники копируются
+        set-based запросами INSERT ... SELECT, без загрузки строк в ORM.
+        Вложения копируются как ссылки на те же файлы.
+        """
+        source = await db.get(Board, board_id)
+        if not source: return None
+
+        new_board = Board(title=title or f"{source.title} (копия)", description=source.description,
+                          background_url=source.background_url)
         db.add(new_board)
         await db.flush()
+        db.add(BoardMember(user_id=user_id, board_id=new_board.id, role=BoardRole.OWNER))
 
-        owner_assoc = BoardMember(user_id=user_id, board_id=new_board.id, role=BoardRole.OWNER)
-        db.add(owner_assoc)
+        if include_members:
+            # Владелец у копии один — тот, кто её создал; прежние владельцы становятся администраторами
+            role = case((BoardMember.role == BoardRole.OWNER, literal(BoardRole.ADMIN.name)), else_=BoardMember.role)
+            await db.execute(insert(BoardMember).from_select(
+                ["user_id", "board_id", "role"],
+                select(BoardMember.user_id, literal(new_board.id), role)
+                .where(BoardMember.board_id == board_id, BoardMember.user_id != user_id)
+            ))
 
-        default_columns = ["В плане", "В работе", "Готово"]
-        for index, col_title in enumerate(default_columns):
-            db.add(Column(title=col_title, order=index, board_id=new_board.id))
-        
+        source_columns = (await db.execute(
+            select(Column.id, Column.title, Column.order).where(Column.board_id == board_id).order_by(Column.id)
+        )).all()
+        new_column_ids = await KanbanService._copy_columns(
+            db, new_board.id, [(c.title, c.order) for c in source_columns]
+        )
+
+        if include_tasks and new_column_ids:
+            column_map = {c.id: new_id for c, new_id in zip(source_columns, new_column_ids)}
+            # Без участников исполнителем можно оставить только того, кто копирует доску
+            assignee = Task.assignee_id if include_members else case((Task.assignee_id == user_id, Task.assignee_id), else_=None)
+            await db.execute(insert(Task).from_select(
+                ["title", "description", "priority", "column_id", "assignee_id", "is_deleted"],
+                select(Task.title, Task.description, Task.priority, case(column_map, value=Task.column_id), assignee, false())
+                .select_from(Task).join(Column).where(Column.board_id == board_id, ACTIVE_TASK)
+                .order_by(Task.id)
+            ))
+            await KanbanService._record_events_from_select(
+                db, select(Column.board_id.label("board_id"), Task.id.label("task_id")).join(Column)
+                .where(Column.board_id == new_board.id),
+                user_id, "cloned"
+            )
+
+            # Копия задачи совпадает с оригиналом по содержимому (с учетом новых колонки и исполнителя).
+            # Одинаковые задачи нумеруются row_number() по id, и i-я копия получает вложения i-го оригинала:
+            # соответствие не зависит от порядка, в котором БД выдала новые id
+            source = (
+                select(Task.id, case(column_map, value=Task.column_id).label("column_id"), Task.title,
+                       Task.description, Task.priority, assignee.label("assignee_id"),
+                       func.row_number().over(
+                           partition_by=[Task.column_id, Task.title, Task.description, Task.priority, assignee],
+                           order_by=Task.id
+                       ).label("n"))
+                .join(Column).where(Column.board_id == board_id, ACTIVE_TASK)
+            ).subquery()
+            copies = (
+                select(Task.id, Task.column_id, Task.title, Task.description, Task.priority, Task.assignee_id,
+                       func.row_number().over(
+                           partition_by=[Task.column_id, Task.title, Task.description, Task.priority, Task.assignee_id],
+                           order_by=Task.id
+                       ).label("n"))
+                .where(Task.column_id.in_(new_column_ids))
+            ).subquery()
+            await db.execute(insert(TaskAttachment).from_select(
+                ["task_id", "file_name", "file_url"],
+                select(copies.c.id, TaskAttachment.file_name, TaskAttachment.file_url)
+                .join(source, source.c.id == TaskAttachment.task_id)
+                .join(copies, and_(
+                    copies.c.column_id == source.c.column_id,
+                    copies.c.title == source.c.title,
+                    copies.c.description.is_not_distinct_from(source.c.description),
+                    copies.c.priority == source.c.priority,
+                    copies.c.assignee_id.is_not_distinct_from(source.c.assignee_id),
+                    copies.c.n == source.c.n,
+                ))
+            ))
+
+        await db.commit()
+        return new_board
+
+    @staticmethod
+    async def create_template(db: AsyncSession, board_id: int, user_id: int, title: str, description: str | None = None):
+        template = BoardTemplate(title=title, description=description, owner_id=user_id)
+        db.add(template)
+        await db.flush()
+        await db.execute(insert(BoardTemplateColumn).from_select(
+            ["title", "order", "template_id"],
+            select(Column.title, Column.order, literal(template.id)).where(Column.board_id == board_id)
+        ))
+        await db.commit()
+        return await KanbanService.get_template(db, template.id, user_id)
+
+    @staticmethod
+    async def get_template(db: AsyncSession, template_id: int, user_id: int):
+        result = await db.execute(
+            select(BoardTemplate).where(BoardTemplate.id == template_id, BoardTemplate.owner_id == user_id)
+            .options(selectinload(BoardTemplate.columns))
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def get_user_templates(db: AsyncSession, user_id: int) -> List[BoardTemplate]:
+        result = await db.execute(
+            select(BoardTemplate).where(BoardTemplate.owner_id == user_id)
+            .options(selectinload(BoardTemplate.columns))
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    async def delete_template(db: AsyncSession, template_id: int, user_id: int) -> bool:
+        result = await db.execute(
+            delete(BoardTemplate).where(BoardTemplate.id == template_id, BoardTemplate.owner_id == user_id)
+        )
+        await db.commit()
+        return bool(result.rowcount)
+
+    @staticmethod
+    async def create_board_from_template(db: AsyncSession, template_id: int, title: str, user_id: int):
+        template_exists = await db.scalar(
+            select(BoardTemplate.id).where(BoardTemplate.id == template_id, BoardTemplate.owner_id == user_id)
+        )
+        if not template_exists: return None
+        new_board = Board(title=title)
+        db.add(new_board)
+        await db.flush()
+        db.add(BoardMember(user_id=user_id, board_id=new_board.id, role=BoardRole.OWNER))
+        await db.execute(insert(Column).from_select(
+            ["title", "order", "board_id"],
+            select(BoardTemplateColumn.title, BoardTemplateColumn.order, literal(new_board.id))
+            .where(BoardTemplateColumn.template_id == template_id)
+        ))
         await db.commit()
-        await db.refresh(new_board)
         return new_board
 
     @staticmethod
@@ -87,14 +454,68 @@ class KanbanService:
         return board
 
     @staticmethod
-    async def delete_board(db: AsyncSession, board_id: int):
-        result = await db.execute(select(Board).where(Board.id == board_id))
-        board = result.scalar_one_or_none()
-        if board:
-            await db.delete(board)
-            await db.commit()
-            return True
-        return False
+    async def count_board_tasks(db: AsyncSession, board_id: int) -> int:
+        return await db.scalar(select(func.count(Task.id)).join(Column).where(Column.board_id == board_id)) or 0
+
+    @staticmethod
+    async def delete_board(db: AsyncSession, board_id: int) -> list[str] | None:
+        """
+        Удаляет доску одним DELETE, колонки, задачи и вложения удаляет каскад БД.
+        Возвращает URL вложений для удаления файлов или None, если доска не найдена.
+        """
+        file_urls = (await db.scalars(
+            select(TaskAttachment.file_url).join(Task).join(Column).where(Column.board_id == board_id)
+        )).all()
+        result = await db.execute(delete(Board).where(Board.id == board_id))
+        file_urls = await KanbanService._unreferenced_files(db, file_urls)
+        await db.commit()
+        return file_urls if result.rowcount else None
+
+    @staticmethod
+    async def detach_board(db: AsyncSession, board_id: int) -> bool:
+        """
+        Убирает всех участников, чтобы доска сразу пропала из списков, и в той же транзакции
+        ставит отметку BoardDeletion, по которой удаление продолжится после перезапуска.
+        """
+        exists = await db.scalar(select(Board.id).where(Board.id == board_id))
+        if not exists: return False
+        await db.execute(delete(BoardMember).where(BoardMember.board_id == board_id))
+        db.add(BoardDeletion(board_id=board_id))
+        await db.commit()
+        return True
+
+    @staticmethod
+    async def delete_board_in_chunks(board_id: int, chunk_size: int = BOARD_DELETE_CHUNK_SIZE):
+        """Фоновое удаление большой доски: задачи удаляются порциями, каждая в своей транзакции."""
+        try:
+            async with async_session() as db:
+                while True:
+                    task_ids = (await db.scalars(
+                        select(Task.id).join(Column).where(Column.board_id == board_id).limit(chunk_size)
+                    )).all()
+                    if not task_ids: break
+                    file_urls = (await db.scalars(
+                        select(TaskAttachment.file_url).where(TaskAttachment.task_id.in_(task_ids))
+                    )).all()
+                    await db.execute(delete(Task).where(Task.id.in_(task_ids)))
+                    file_urls = await KanbanService._unreferenced_files(db, file_urls)
+                    await db.commit()
+                    remove_upload_files(file_urls)
+                # Отметка BoardDeletion удаляется каскадом вместе с доской
+                await db.execute(delete(Board).where(Board.id == board_id))
+                await db.commit()
+        except Exception:
+            # Отметка осталась в БД — удаление будет продолжено при следующем старте
+            logger.exception("Не удалось удалить доску %s, повтор при следующем запуске", board_id)
+
+    @staticmethod
+    async def resume_board_deletions():
+        """Продолжает фоновые удаления досок, прерванные перезапуском или ошибкой."""
+        async with async_session() as db:
+            board_ids = (await db.scalars(select(BoardDeletion.board_id))).all()
+        for board_id in board_ids:
+            logger.info("Продолжаем удаление доски %s", board_id)
+            await KanbanService.delete_board_in_chunks(board_id)
 
     @staticmethod
     async def invite_member(db: AsyncSession, board_id: int, email: str, role_str: str):
@@ -180,17 +601,22 @@ class KanbanService:
         return None
 
     @staticmethod
-    async def delete_column(db: AsyncSession, column_id: int):
-        result = await db.execute(select(Column).where(Column.id == column_id))
-        col = result.scalar_one_or_none()
-        if col:
-            await db.delete(col)
-            await db.commit()
-            return True
-        return False
+    async def delete_column(db: AsyncSession, column_id: int, user_id: int | None = None) -> list[str] | None:
+        file_urls = (await db.scalars(
+            select(TaskAttachment.file_url).join(Task).where(Task.column_id == column_id)
+        )).all()
+        await KanbanService._record_events_from_select(
+            db, select(Column.board_id.label("board_id"), Task.id.label("task_id")).join(Column)
+            .where(Task.column_id == column_id, ACTIVE_TASK),
+            user_id, "deleted"
+        )
+        result = await db.execute(delete(Column).where(Column.id == column_id))
+        file_urls = await KanbanService._unreferenced_files(db, file_urls)
+        await db.commit()
+        return file_urls if result.rowcount else None
 
     @staticmethod
-    async def create_task(db: AsyncSession, task_data):
+    async def create_task(db: AsyncSession, task_data, board_id: int, user_id: int | None = None):
         try: priority_enum = TaskPriority[task_data.priority.upper()]
         except KeyError: priority_enum = TaskPriority.MEDIUM
 
@@ -203,6 +629,11 @@ class KanbanService:
             is_deleted=False
         )
         db.add(new_task)
+        await db.flush()
+        await KanbanService._record_events(db, [KanbanService._event(
+            board_id, new_task.id, user_id, "created",
+            {"title": new_task.title, "column_id": new_task.column_id}
+        )])
         await db.commit()
         
         result = await db.execute(
@@ -212,10 +643,13 @@ class KanbanService:
         return result.scalar_one()
 
     @staticmethod
-    async def update_task(db: AsyncSession, task_id: int, task_data):
-        result = await db.execute(select(Task).where(Task.id == task_id))
-        task = result.scalar_one_or_none()
-        if task:
+    async def update_task(db: AsyncSession, task_id: int, task_data, user_id: int | None = None):
+        result = await db.execute(select(Task, Column.board_id).join(Column).where(Task.id == task_id))
+        row = result.one_or_none()
+        if row:
+            task, board_id = row
+            before = {"title": task.title, "description": task.description,
+                      "priority": task.priority.value if task.priority else None, "assignee_id": task.assignee_id}
             if task_data.title: task.title = task_data.title
             if task_data.description is not None: task.description = task_data.description
             if task_data.priority:
@@ -223,7 +657,12 @@ class KanbanService:
                 except KeyError: pass 
             if task_data.assignee_id is not None:
                 task.assignee_id = task_data.assignee_id if task_data.assignee_id > 0 else None
-            
+            after = {"title": task.title, "description": task.description,
+                     "priority": task.priority.value if task.priority else None, "assignee_id": task.assignee_id}
+
+            changes = {k: [before[k], after[k]] for k in before if before[k] != after[k]}
+            if changes:
+                await KanbanService._record_events(db, [KanbanService._event(board_id, task_id, user_id, "updated", changes)])
             await db.commit()
             
             result_updated = await db.execute(
@@ -234,19 +673,44 @@ class KanbanService:
         return None
 
     @staticmethod
-    async def delete_task(db: AsyncSession, task_id: int):
+    async def move_task(db: AsyncSession, task_id: int, column_id: int, board_id: int, user_id: int | None = None):
         result = await db.execute(select(Task).where(Task.id == task_id))
         task = result.scalar_one_or_none()
-        if task:
+        if not task: return None
+        if task.column_id != column_id:
+            await KanbanService._record_events(db, [KanbanService._event(
+                board_id, task_id, user_id, "moved", {"column_id": [task.column_id, column_id]}
+            )])
+            task.column_id = column_id
+        await db.commit()
+
+        # Решение ошибки при перетаскивании (MissingGreenlet)
+        res2 = await db.execute(
+            select(Task).where(Task.id == task_id)
+            .options(selectinload(Task.assignee), selectinload(Task.attachments))
+        )
+        return res2.scalar_one()
+
+    @staticmethod
+    async def delete_task(db: AsyncSession, task_id: int, user_id: int | None = None):
+        result = await db.execute(select(Task, Column.board_id).join(Column).where(Task.id == task_id))
+        row = result.one_or_none()
+        if row:
+            task, board_id = row
             task.is_deleted = True
+            await KanbanService._record_events(db, [KanbanService._event(board_id, task_id, user_id, "deleted")])
             await db.commit()
             return True
         return False
 
     @staticmethod
-    async def add_task_attachment(db: AsyncSession, task_id: int, file_name: str, file_url: str):
+    async def add_task_attachment(db: AsyncSession, task_id: int, board_id: int, file_name: str, file_url: str,
+                                  user_id: int | None = None):
         attachment = TaskAttachment(task_id=task_id, file_name=file_name, file_url=file_url)
         db.add(attachment)
+        await KanbanService._record_events(db, [KanbanService._event(
+            board_id, task_id, user_id, "attachment_added", {"file_name": file_name}
+        )])
         await db.commit()
         await db.refresh(attachment)
         return attachment
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Замер ответа GET /boards тем же путем, которым его строит FastAPI: валидация
+ORM-объектов по response_model (List[BoardRead] или List[BoardCompactRead],
+from_attributes), dump в JSON-совместимые объекты и render класса ответа —
+стандартный JSONResponse против ORJSONResponse. Размер тела — без сжатия и с gzip.
+Доски собираются из ORM-моделей без БД, поэтому в замер входит и доступ
+к инструментированным атрибутам SQLAlchemy.
+
+Запуск: PYTHONPATH=. python benchmarks/bench_board_payload.py [число_задач] [число_пользователей]
+"""
+
+import gzip
+import sys
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.models.database_and_models import (
+    Board, BoardMember, BoardRole, Column, Task, TaskAttachment, TaskPriority, User
+)
+from app.schemas.schemas_and_auth import BoardRead, BoardCompactRead
+from app.services.kanban import KanbanService
+
+
+def make_board(tasks: int, user_count: int) -> Board:
+    users = [User(
+        id=i, username=f"user_{i}", email=f"user_{i}@example.com",
+        description="Разработчик команды канбан-доски", avatar_url=f"/static/uploads/avatar_{i}_0a1b2c3d.jpg",
+        is_superuser=False,
+    ) for i in range(1, user_count + 1)]
+    columns = []
+    for c in range(3):
+        col_tasks = []
+        for t in range(c, tasks, 3):
+            assignee = users[t % len(users)]
+            col_tasks.append(Task(
+                id=t, title=f"Задача {t}", description="Описание задачи " * 3, priority=TaskPriority.MEDIUM,
+                column_id=c, assignee_id=assignee.id, assignee=assignee, is_deleted=False,
+                attachments=[TaskAttachment(id=t, file_name="spec.pdf", file_url=f"/static/uploads/{t}_spec.pdf")]
+                if t % 10 == 0 else [],
+            ))
+        columns.append(Column(id=c, title=f"Колонка {c}", order=c, board_id=1, tasks=col_tasks))
+    return Board(
+        id=1, title="Доска", description=None, background_url=None,
+        member_associations=[BoardMember(user_id=u.id, user=u, role=BoardRole.MEMBER) for u in users],
+        columns=columns,
+    )
+
+
+def measure(name: str, build, repeat: int):
+    """build() возвращает содержимое ответа; время — валидация + dump + render."""
+    timings = {"validate+dump": 0.0, "json": 0.0, "orjson": 0.0}
+    bodies = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        content = build()
+        timings["validate+dump"] += time.perf_counter() - start
+        for label, response_class in (("json", JSONResponse), ("orjson", ORJSONResponse)):
+            start = time.perf_counter()
+            bodies[label] = response_class(content).body
+            timings[label] += time.perf_counter() - start
+    prepare_ms = timings["validate+dump"] / repeat * 1000
+    for label in ("json", "orjson"):
+        body = bodies[label]
+        render_ms = timings[label] / repeat * 1000
+        print(f"{name + ' / ' + label:<20} {len(body):>10} B  gzip {len(gzip.compress(body, 6)):>9} B  "
+              f"подготовка {prepare_ms:8.2f} мс  render {render_ms:7.2f} мс  всего {prepare_ms + render_ms:8.2f} мс")
+
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    repeat = 10
+    boards = [make_board(tasks, user_count)]
+    nested = TypeAdapter(List[BoardRead])
+    compact = TypeAdapter(List[BoardCompactRead])
+    print(f"Задач: {tasks}, пользователей: {user_count}")
+    # Так же, как fastapi.routing.serialize_response: validate_python(from_attributes) и dump_python(mode="json")
+    measure("nested", lambda: nested.dump_python(nested.validate_python(boards, from_attributes=True), mode="json"), repeat)
+    measure("compact", lambda: compact.dump_python(compact.validate_python(
+        [KanbanService.compact_board(b) for b in boards], from_attributes=True), mode="json"), repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Замер удаления доски со 100 000 задач (по умолчанию) двумя способами:
+одним DELETE с каскадом в БД (KanbanService.delete_board) и фоновым удалением
+порциями (KanbanService.delete_board_in_chunks).
+
+Запуск: PYTHONPATH=. DATABASE_URL=postgresql+asyncpg://... python benchmarks/bench_delete_board.py [число_задач]
+Без DATABASE_URL используется временный файл SQLite.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from sqlalchemy import insert
+
+from app.models.database_and_models import (
+    engine, async_session, Base, Board, Column, Task, TaskPriority
+)
+from app.services.kanban import KanbanService
+
+
+async def seed_board(tasks: int) -> int:
+    async with async_session() as db:
+        board = Board(title="Большая доска")
+        db.add(board)
+        await db.flush()
+        columns = [Column(title=f"Колонка {i}", order=i, board_id=board.id) for i in range(3)]
+        db.add_all(columns)
+        await db.flush()
+        for start in range(0, tasks, 10000):
+            await db.execute(insert(Task), [
+                {"title": f"Задача {i}", "column_id": columns[i % 3].id,
+                 "priority": TaskPriority.MEDIUM, "is_deleted": False}
+                for i in range(start, min(start + 10000, tasks))
+            ])
+        await db.commit()
+        return board.id
+
+
+async def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    board_id = await seed_board(tasks)
+    start = time.perf_counter()
+    async with async_session() as db:
+        await KanbanService.delete_board(db, board_id)
+    print(f"delete_board (один DELETE, каскад БД): {time.perf_counter() - start:8.3f} с на {tasks} задач")
+
+    board_id = await seed_board(tasks)
+    start = time.perf_counter()
+    await KanbanService.delete_board_in_chunks(board_id)
+    print(f"delete_board_in_chunks (фоновое):      {time.perf_counter() - start:8.3f} с на {tasks} задач")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
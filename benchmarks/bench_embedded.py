@@ -0,0 +1,83 @@
+"""
+Сравнение встроенного режима SQLite и PostgreSQL на нагрузке небольшой команды:
+параллельные чтения досок (KanbanService.get_user_boards через пул читателей)
+вперемешку с созданием задач (через единственное пишущее соединение).
+
+Запуск (по очереди для каждой БД):
+    PYTHONPATH=. KANBAN_EMBEDDED=1 SQLITE_PATH=/tmp/bench.db python benchmarks/bench_embedded.py
+    PYTHONPATH=. DATABASE_URL=postgresql+asyncpg://... python benchmarks/bench_embedded.py
+Аргументы: [число_операций] [доля_записей]
+"""
+
+import asyncio
+import sys
+import time
+
+from app.models.database_and_models import (
+    engine, read_engine, async_session, read_async_session, Base, DATABASE_URL
+)
+from app.schemas.schemas_and_auth import TaskCreate
+from app.services.kanban import KanbanService
+
+USERS = 10
+CONCURRENCY = 20
+
+
+async def seed() -> list[tuple[int, int, int]]:
+    """Создает пользователей с досками; возвращает (user_id, id доски, id первой колонки)."""
+    result = []
+    async with async_session() as db:
+        for i in range(USERS):
+            user = await KanbanService.register_user(db, f"bench_{i}", f"bench_{i}@example.com", "x")
+            boards = await KanbanService.get_user_boards(db, user.id)
+            result.append((user.id, boards[0].id, boards[0].columns[0].id))
+    return result
+
+
+async def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    write_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    users = await seed()
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = {"read": [], "write": []}
+    write_every = max(1, round(1 / write_share)) if write_share > 0 else 0
+
+    async def operation(i: int):
+        user_id, board_id, column_id = users[i % len(users)]
+        is_write = bool(write_every) and i % write_every == 0
+        async with semaphore:
+            start = time.perf_counter()
+            if is_write:
+                async with async_session() as db:
+                    await KanbanService.create_task(
+                        db, TaskCreate(title=f"Задача {i}", column_id=column_id), board_id, user_id
+                    )
+            else:
+                async with read_async_session() as db:
+                    await KanbanService.get_user_boards(db, user_id)
+            latencies["write" if is_write else "read"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(operation(i) for i in range(operations)))
+    elapsed = time.perf_counter() - start
+
+    print(f"БД: {DATABASE_URL.split('://')[0]}, операций: {operations}, доля записей: {write_share}")
+    print(f"Всего: {elapsed:.3f} с, {operations / elapsed:.0f} операций/с")
+    for kind, values in latencies.items():
+        if not values: continue
+        values.sort()
+        p50 = values[len(values) // 2] * 1000
+        p95 = values[int(len(values) * 0.95)] * 1000
+        print(f"{kind:<6} n={len(values):<6} p50={p50:7.2f} мс  p95={p95:7.2f} мс")
+
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Замер массовой регистрации: N параллельных KanbanService.register_user
+(пользователь + доска с колонками в одной транзакции) для нескольких N.
+Время на одного пользователя должно оставаться примерно постоянным.
+Хэш пароля считается один раз заранее, чтобы мерить только работу с БД.
+В конце печатается число администраторов: при любой параллельности он должен быть один.
+
+Запуск: PYTHONPATH=. DATABASE_URL=postgresql+asyncpg://... python benchmarks/bench_signup.py [N ...]
+Без DATABASE_URL используется временный файл SQLite.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from sqlalchemy import func, select
+
+from app.models.database_and_models import engine, async_session, Base, User
+from app.schemas.schemas_and_auth import AuthHandler
+from app.services.kanban import KanbanService
+
+CONCURRENCY = 20
+
+
+async def signup_storm(count: int, prefix: str, hashed_password: str):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def signup(i: int):
+        async with semaphore, async_session() as db:
+            await KanbanService.register_user(db, f"{prefix}_{i}", f"{prefix}_{i}@example.com", hashed_password)
+
+    await asyncio.gather(*(signup(i) for i in range(count)))
+
+
+async def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [100, 1000, 5000]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    hashed_password = AuthHandler.get_password_hash("password123")
+    for size in sizes:
+        start = time.perf_counter()
+        await signup_storm(size, f"bench{size}", hashed_password)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>6} регистраций: {elapsed:8.3f} с, {elapsed / size * 1000:7.2f} мс на пользователя")
+
+    async with async_session() as db:
+        superusers = await db.scalar(select(func.count()).select_from(User).where(User.is_superuser))
+    print(f"Администраторов: {superusers}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,8 +3,8 @@
 работы тестов в GitHub Actions, а также содержит два теста,
 один из которых пытается создать нового пользователя и
 ожидает успешный ответ сервера, а второй пытается получить
-доступ к несуществующей доске за неавторизованного пользователя,
-ожидается, что вернётся пустой json список.
+доступ к доскам без токена (ожидается 401) и с токеном пользователя
+без досок (ожидается пустой json список).
 """
 
 
@@ -13,6 +13,23 @@ import pytest_asyncio
 from httpx import AsyncClient
 from app.main import app
 from app.models.database_and_models import Base, engine
+from app.schemas.schemas_and_auth import AuthHandler, Principal
+
+
+def auth(user: dict) -> dict:
+    return {"Authorization": f"Bearer {user['access_token']}"}
+
+async def register_user(ac: AsyncClient, name: str) -> dict:
+    """Регистрирует пользователя с паролем password123; возвращает ответ /register с токеном."""
+    response = await ac.post("/api/v1/register", json={
+        "username": name, "email": f"{name}@example.com", "password": "password123"
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+async def first_board(ac: AsyncClient, user: dict) -> dict:
+    """Доска, созданная пользователю при регистрации."""
+    return (await ac.get("/api/v1/boards", headers=auth(user))).json()[0]
 
 @pytest_asyncio.fixture(scope="function", autouse=True)
 async def setup_database():
@@ -26,6 +43,15 @@ async def setup_database():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
+@pytest.fixture(autouse=True)
+def disable_rate_limit(monkeypatch):
+    """
+    Все тесты ходят в приложение с одного адреса, и общая на весь прогон корзина
+    /register рано или поздно кончилась бы. Лимиты проверяются отдельно, на своем приложении.
+    """
+    import app.api.rate_limit as rate_limit
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", False)
+
 @pytest.mark.asyncio
 async def test_register_user():
     async with AsyncClient(app=app, base_url="http://test") as ac:
@@ -40,6 +66,356 @@ async def test_register_user():
 @pytest.mark.asyncio
 async def test_get_boards_unauthorized():
     async with AsyncClient(app=app, base_url="http://test") as ac:
-        response = await ac.get("/api/v1/boards?user_id=999")
+        anonymous = await ac.get("/api/v1/boards")
+        token = AuthHandler.create_access_token({"sub": "999"})
+        response = await ac.get("/api/v1/boards", headers={"Authorization": f"Bearer {token}"})
+    assert anonymous.status_code == 401
+    assert response.status_code == 200
+    assert response.json() == []
+
+class _FakeSessionFactory:
+    """Фабрика сессий, запоминающая, сколько раз из неё брали сессию."""
+    def __init__(self):
+        self.opened = 0
+
+    def __call__(self):
+        factory = self
+        class _Session:
+            async def __aenter__(self):
+                factory.opened += 1
+                return self
+            async def __aexit__(self, *exc):
+                return False
+            async def close(self):
+                pass
+        return _Session()
+
+async def _read_session_source(cookies: dict | None = None, headers: dict | None = None) -> str:
+    import app.db.session as session_module
+    from starlette.requests import Request
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    if cookies:
+        raw_headers.append((b"cookie", "; ".join(f"{k}={v}" for k, v in cookies.items()).encode()))
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers})
+    before = session_module.async_session.opened
+    generator = session_module.get_read_db(request)
+    await generator.__anext__()
+    await generator.aclose()
+    return "primary" if session_module.async_session.opened > before else "replica"
+
+@pytest.mark.asyncio
+async def test_get_read_db_routes_by_last_write(monkeypatch):
+    import time
+    import app.db.session as session_module
+    monkeypatch.setattr(session_module, "READ_DATABASE_URL", "postgresql+asyncpg://replica/db")
+    monkeypatch.setattr(session_module, "async_session", _FakeSessionFactory())
+    monkeypatch.setattr(session_module, "read_async_session", _FakeSessionFactory())
+    cookie = session_module.LAST_WRITE_COOKIE
+    header = session_module.LAST_WRITE_HEADER
+    stale = time.time() - session_module.READ_AFTER_WRITE_SECONDS - 1
+
+    assert await _read_session_source() == "replica"
+    assert await _read_session_source(cookies={cookie: str(time.time())}) == "primary"
+    assert await _read_session_source(headers={header: str(time.time())}) == "primary"
+    assert await _read_session_source(cookies={cookie: str(stale)}) == "replica"
+    assert await _read_session_source(cookies={cookie: "garbage"}) == "replica"
+
+@pytest.mark.asyncio
+async def test_writes_set_last_write_cookie():
+    from app.db.session import LAST_WRITE_COOKIE, LAST_WRITE_HEADER
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/api/v1/register", json={
+            "username": "sticky", "email": "sticky@example.com", "password": "password123"
+        })
+        boards = await ac.get("/api/v1/boards", headers=auth(response.json()))
+    assert LAST_WRITE_COOKIE in response.cookies
+    assert LAST_WRITE_HEADER in response.headers
+    assert LAST_WRITE_COOKIE not in boards.cookies
+
+@pytest.mark.asyncio
+async def test_task_history_records_events():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "history_user")
+        board = await first_board(ac, user)
+        column_id = board["columns"][0]["id"]
+        task = (await ac.post("/api/v1/tasks", headers=auth(user), json={
+            "title": "Первая", "column_id": column_id
+        })).json()
+        await ac.put(f"/api/v1/tasks/{task['id']}", headers=auth(user), json={"title": "Вторая"})
+        response = await ac.get(f"/api/v1/tasks/{task['id']}/history", headers=auth(user))
+    assert response.status_code == 200
+    events = response.json()["items"]
+    assert [e["event_type"] for e in events] == ["updated", "created"]
+    assert events[0]["payload"]["title"] == ["Первая", "Вторая"]
+
+@pytest.mark.asyncio
+async def test_rate_limit_token_bucket():
+    from app.api.rate_limit import InMemoryRateLimitStore, RateLimit
+    store = InMemoryRateLimitStore()
+    limit = RateLimit(rate=1, capacity=2)
+    assert await store.take("user:1", limit) == 0
+    assert await store.take("user:1", limit) == 0
+    assert await store.take("user:1", limit) > 0
+    assert await store.take("user:2", limit) == 0
+
+@pytest.mark.asyncio
+async def test_rate_limit_returns_429_with_retry_after(monkeypatch):
+    from fastapi import FastAPI
+    import app.api.rate_limit as rate_limit
+    from app.api.rate_limit import RateLimitMiddleware, InMemoryRateLimitStore, ROUTE_LIMITS
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    limited_app = FastAPI()
+    limited_app.add_middleware(RateLimitMiddleware, store=InMemoryRateLimitStore())
+
+    @limited_app.get("/api/v1/boards")
+    async def boards():
+        return []
+
+    capacity = ROUTE_LIMITS[("GET", "/api/v1/boards")].capacity
+    async with AsyncClient(app=limited_app, base_url="http://test") as ac:
+        statuses = [(await ac.get("/api/v1/boards")) for _ in range(capacity + 1)]
+    assert all(r.status_code == 200 for r in statuses[:capacity])
+    assert statuses[-1].status_code == 429
+    assert int(statuses[-1].headers["Retry-After"]) >= 1
+
+@pytest.mark.asyncio
+async def test_compression_only_for_api():
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+    from app.api.compression import ApiCompressionMiddleware
+    compressed_app = FastAPI()
+    compressed_app.add_middleware(ApiCompressionMiddleware, minimum_size=100)
+    body = "x" * 5000
+
+    @compressed_app.get("/api/v1/data")
+    async def api_data():
+        return PlainTextResponse(body)
+
+    @compressed_app.get("/static/data.txt")
+    async def static_data():
+        return PlainTextResponse(body)
+
+    async with AsyncClient(app=compressed_app, base_url="http://test") as ac:
+        api = await ac.get("/api/v1/data", headers={"Accept-Encoding": "gzip"})
+        api_br = await ac.get("/api/v1/data", headers={"Accept-Encoding": "br, gzip"})
+        static = await ac.get("/static/data.txt", headers={"Accept-Encoding": "br, gzip"})
+    assert api.headers.get("content-encoding") == "gzip" and api.text == body
+    assert api_br.headers.get("content-encoding") == "br" and api_br.text == body
+    assert "content-encoding" not in static.headers and static.text == body
+
+@pytest.mark.asyncio
+async def test_rate_limit_concurrency_slots():
+    from app.api.rate_limit import InMemoryRateLimitStore
+    store = InMemoryRateLimitStore()
+    first = await store.acquire_slot("expensive", 2)
+    assert first and await store.acquire_slot("expensive", 2)
+    assert await store.acquire_slot("expensive", 2) is None
+    await store.release_slot("expensive", first)
+    await store.release_slot("expensive", first)  # повторное освобождение не добавляет мест
+    assert await store.acquire_slot("expensive", 2)
+    assert await store.acquire_slot("expensive", 2) is None
+
+@pytest.mark.asyncio
+async def test_get_boards_compact():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "compact_user")
+        response = await ac.get("/api/v1/boards/compact", headers=auth(user))
+    assert response.status_code == 200
+    board = response.json()[0]
+    assert board["members"] == [{"user_id": user["id"], "role": "OWNER"}]
+    assert board["users"][str(user["id"])]["username"] == "compact_user"
+
+
+def test_principal_from_token_claims():
+    token = AuthHandler.create_access_token({"sub": "7", "su": True})
+    assert AuthHandler.get_principal(token) == Principal(user_id=7, is_superuser=True)
+    assert AuthHandler.get_principal_from_header(f"Bearer {token}") == Principal(user_id=7, is_superuser=True)
+    assert AuthHandler.get_principal("not-a-token") is None
+
+@pytest.mark.asyncio
+async def test_delete_board_cascades_in_database():
+    from sqlalchemy import select, func
+    from app.models.database_and_models import async_session, Column, Task
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "cascade_user")
+        board = await first_board(ac, user)
+        await ac.post("/api/v1/tasks", headers=auth(user), json={"title": "Задача", "column_id": board["columns"][0]["id"]})
+        response = await ac.delete(f"/api/v1/boards/{board['id']}", headers=auth(user))
+    assert response.status_code == 200
+    async with async_session() as db:
+        assert await db.scalar(select(func.count(Column.id)).where(Column.board_id == board["id"])) == 0
+        assert await db.scalar(select(func.count(Task.id))) == 0
+
+@pytest.mark.asyncio
+async def test_clone_board_copies_columns_and_tasks():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "clone_user")
+        board = await first_board(ac, user)
+        await ac.post("/api/v1/tasks", headers=auth(user), json={"title": "Задача", "column_id": board["columns"][1]["id"]})
+        response = await ac.post(f"/api/v1/boards/{board['id']}/clone", headers=auth(user), json={"title": "Копия"})
+    assert response.status_code == 200
+    clone = response.json()
+    assert clone["id"] != board["id"] and clone["title"] == "Копия"
+    assert [c["title"] for c in clone["columns"]] == [c["title"] for c in board["columns"]]
+    assert [t["title"] for t in clone["columns"][1]["tasks"]] == ["Задача"]
+
+@pytest.mark.asyncio
+async def test_clone_board_copies_attachments():
+    from app.models.database_and_models import async_session
+    from app.services.kanban import KanbanService
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "clone_files")
+        board = await first_board(ac, user)
+        column_id = board["columns"][0]["id"]
+        tasks = [(await ac.post("/api/v1/tasks", headers=auth(user), json={"title": title, "column_id": column_id})).json()
+                 for title in ("Дубль", "Дубль", "Другая")]
+        async with async_session() as db:
+            for task, name in zip(tasks, ("a.txt", "b.txt", "c.txt")):
+                await KanbanService.add_task_attachment(db, task["id"], board["id"], name, f"/static/uploads/{name}", user["id"])
+        clone = (await ac.post(f"/api/v1/boards/{board['id']}/clone", headers=auth(user), json={})).json()
+    cloned = clone["columns"][0]["tasks"]
+    assert all(len(t["attachments"]) == 1 for t in cloned)
+    names = {t["title"]: set() for t in cloned}
+    for t in cloned: names[t["title"]].add(t["attachments"][0]["file_name"])
+    assert names == {"Дубль": {"a.txt", "b.txt"}, "Другая": {"c.txt"}}
+
+@pytest.mark.asyncio
+async def test_register_duplicate_username():
+    payload = {"username": "dup_user", "email": "dup@example.com", "password": "password123"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        first = await ac.post("/api/v1/register", json=payload)
+        second = await ac.post("/api/v1/register", json={**payload, "email": "dup2@example.com"})
+    assert first.status_code == 200
+    assert second.status_code == 400
+
+@pytest.mark.asyncio
+async def test_sqlite_embedded_pragmas():
+    from sqlalchemy import text
+    if engine.dialect.name != "sqlite":
+        pytest.skip("Проверка только для встроенного режима SQLite")
+    async with engine.connect() as conn:
+        assert (await conn.scalar(text("PRAGMA foreign_keys"))) == 1
+        if engine.url.database not in (None, "", ":memory:"):
+            assert (await conn.scalar(text("PRAGMA journal_mode"))).lower() == "wal"
+
+@pytest.mark.asyncio
+async def test_refresh_token():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "refresh_user")
+        response = await ac.post("/api/v1/auth/refresh", headers=auth(user))
+        anonymous = await ac.post("/api/v1/auth/refresh")
     assert response.status_code == 200
-    assert response.json() == []
\ No newline at end of file
+    assert AuthHandler.get_principal(response.json()["access_token"]).user_id == user["id"]
+    assert anonymous.status_code == 401
+
+@pytest.mark.asyncio
+async def test_password_change_revokes_refresh():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "revoke_user")
+        changed = await ac.put("/api/v1/users/me/password", headers=auth(user),
+                               json={"old_password": "password123", "new_password": "password456"})
+        stale = await ac.post("/api/v1/auth/refresh", headers=auth(user))
+        fresh = await ac.post("/api/v1/auth/refresh", headers=auth(changed.json()))
+    assert changed.status_code == 200
+    assert stale.status_code == 401
+    assert fresh.status_code == 200
+
+@pytest.mark.asyncio
+async def test_deleted_user_token_gets_401_on_writes():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        admin = await register_user(ac, "deleting_admin")
+        victim = await register_user(ac, "deleted_user")
+        admin_token = AuthHandler.create_access_token({"sub": str(admin["id"]), "su": True})
+        deleted = await ac.delete(f"/api/v1/admin/users/{victim['id']}", headers={"Authorization": f"Bearer {admin_token}"})
+        board = await ac.post("/api/v1/boards", headers=auth(victim), json={"title": "После удаления"})
+        avatar = await ac.post("/api/v1/users/me/avatar", headers=auth(victim), files={"file": ("a.png", b"png")})
+    assert deleted.status_code == 200
+    assert board.status_code == 401
+    assert avatar.status_code == 401
+
+@pytest.mark.asyncio
+async def test_first_user_becomes_admin_once():
+    import asyncio
+    from sqlalchemy import func, select
+    from app.models.database_and_models import async_session, User
+    from app.services.kanban import KanbanService
+
+    async def signup(i: int):
+        async with async_session() as db:
+            return await KanbanService.register_user(db, f"boot_{i}", f"boot_{i}@example.com", "x")
+
+    users = await asyncio.gather(*(signup(i) for i in range(10)))
+    async with async_session() as db:
+        superusers = await db.scalar(select(func.count()).select_from(User).where(User.is_superuser))
+    assert superusers == 1
+    assert sum(u.is_superuser for u in users) == 1
+
+@pytest.mark.asyncio
+async def test_login_returns_token():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await register_user(ac, "login_user")
+        response = await ac.post("/api/v1/login", json={"username": "login_user", "password": "password123"})
+        wrong = await ac.post("/api/v1/login", json={"username": "login_user", "password": "wrong"})
+    assert response.status_code == 200 and response.json()["access_token"]
+    assert wrong.status_code == 401
+
+@pytest.mark.asyncio
+async def test_pending_board_deletion_is_resumed():
+    from sqlalchemy import select
+    from app.models.database_and_models import async_session, Board, BoardDeletion
+    from app.services.kanban import KanbanService
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "pending_user")
+        board = await first_board(ac, user)
+    async with async_session() as db:
+        assert await KanbanService.detach_board(db, board["id"])
+        assert await db.scalar(select(BoardDeletion.board_id)) == board["id"]
+    await KanbanService.resume_board_deletions()
+    async with async_session() as db:
+        assert await db.scalar(select(Board.id).where(Board.id == board["id"])) is None
+        assert await db.scalar(select(BoardDeletion.board_id)) is None
+
+@pytest.mark.asyncio
+async def test_board_activity_cursor_pagination():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "activity_user")
+        board = await first_board(ac, user)
+        for title in ("A", "B", "C"):
+            await ac.post("/api/v1/tasks", headers=auth(user), json={"title": title, "column_id": board["columns"][0]["id"]})
+        url = f"/api/v1/boards/{board['id']}/activity?limit=2"
+        first = (await ac.get(url, headers=auth(user))).json()
+        second = (await ac.get(f"{url}&cursor={first['next_cursor']}", headers=auth(user))).json()
+        broken = await ac.get(f"{url}&cursor=broken", headers=auth(user))
+    titles = [e["payload"]["title"] for e in first["items"] + second["items"]]
+    assert titles == ["C", "B", "A"]
+    assert second["next_cursor"] is None
+    assert broken.status_code == 400
+
+@pytest.mark.asyncio
+async def test_delete_column_logs_events_in_bulk():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "bulk_user")
+        board = await first_board(ac, user)
+        column_id = board["columns"][0]["id"]
+        for title in ("A", "B"):
+            await ac.post("/api/v1/tasks", headers=auth(user), json={"title": title, "column_id": column_id})
+        await ac.delete(f"/api/v1/columns/{column_id}", headers=auth(user))
+        activity = (await ac.get(f"/api/v1/boards/{board['id']}/activity", headers=auth(user))).json()
+    assert [e["event_type"] for e in activity["items"]].count("deleted") == 2
+
+@pytest.mark.asyncio
+async def test_task_history_survives_column_delete():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        user = await register_user(ac, "history_owner")
+        stranger = await register_user(ac, "history_stranger")
+        board = await first_board(ac, user)
+        column_id = board["columns"][0]["id"]
+        task = (await ac.post("/api/v1/tasks", headers=auth(user), json={"title": "A", "column_id": column_id})).json()
+        await ac.delete(f"/api/v1/columns/{column_id}", headers=auth(user))
+        history = await ac.get(f"/api/v1/tasks/{task['id']}/history", headers=auth(user))
+        foreign = await ac.get(f"/api/v1/tasks/{task['id']}/history", headers=auth(stranger))
+        missing = await ac.get("/api/v1/tasks/999999/history", headers=auth(user))
+    assert history.status_code == 200
+    assert [e["event_type"] for e in history.json()["items"]] == ["deleted", "created"]
+    assert foreign.status_code == 403
+    assert missing.status_code == 404